@@ -1,26 +1,102 @@
+import os
+import sqlite3
 import sys
+import threading
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from langchain.embeddings import CacheBackedEmbeddings
+from langchain_core.embeddings import Embeddings
+from langchain_core.stores import ByteStore
 from langchain_ollama.embeddings import OllamaEmbeddings
 from src.logger import logging
 from src.exception import MyException
 
 
+class SQLiteByteStore(ByteStore):
+    """
+    Byte store backed by a single SQLite database file.
+
+    Used for the embedding cache in place of a file-per-vector store: one
+    database holds every cached vector, lookups and inserts are batched per
+    embed call, and a warm reindex of an unchanged corpus touches one file.
+    """
+
+    def __init__(self, db_path: str):
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS emb (k TEXT PRIMARY KEY, v BLOB)"
+            )
+            self._conn.commit()
+
+    def mget(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        if not keys:
+            return []
+        placeholders = ",".join("?" * len(keys))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT k, v FROM emb WHERE k IN ({placeholders})", list(keys)
+            ).fetchall()
+        found = dict(rows)
+        return [found.get(k) for k in keys]
+
+    def mset(self, key_value_pairs: Sequence[Tuple[str, bytes]]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO emb (k, v) VALUES (?, ?)",
+                list(key_value_pairs),
+            )
+            self._conn.commit()
+
+    def mdelete(self, keys: Sequence[str]) -> None:
+        if not keys:
+            return
+        placeholders = ",".join("?" * len(keys))
+        with self._lock:
+            self._conn.execute(
+                f"DELETE FROM emb WHERE k IN ({placeholders})", list(keys)
+            )
+            self._conn.commit()
+
+    def yield_keys(self, *, prefix: Optional[str] = None) -> Iterator[str]:
+        query = "SELECT k FROM emb"
+        params: Tuple[str, ...] = ()
+        if prefix is not None:
+            query += " WHERE k LIKE ?"
+            params = (prefix + "%",)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        for (key,) in rows:
+            yield key
+
+
 class OllamaEmbedder:
     """
     Thin wrapper around LangChain's OllamaEmbeddings to delay initialization
     until it is actually needed.
+
+    Embeddings are cached in SQLite keyed by (model namespace, text hash), so
+    chunks shared with a previously indexed corpus are never re-embedded.
     """
 
-    def __init__(self, model_name: str = "embeddinggemma"):
+    def __init__(self, model_name: str = "embeddinggemma", cache_dir: str = ".rag_cache/emb"):
         # Model name should eventually come from configuration/constants.
         self.model_name = model_name
+        self.cache_dir = cache_dir
         self._embedder = None
 
-    def get_embedder(self) -> OllamaEmbeddings:
-        """Create (once) and return the Ollama embedding model."""
+    def get_embedder(self) -> Embeddings:
+        """Create (once) and return the cache-backed Ollama embedding model."""
         if self._embedder is None:
             try:
                 logging.info("Initializing the Ollama embedder.")
-                self._embedder = OllamaEmbeddings(model=self.model_name)
+                underlying = OllamaEmbeddings(model=self.model_name)
+                store = SQLiteByteStore(os.path.join(self.cache_dir, "embeddings.db"))
+                self._embedder = CacheBackedEmbeddings.from_bytes_store(
+                    underlying, store, namespace=self.model_name
+                )
             except Exception as e:
                 raise MyException(e, sys)
-        return self._embedder
\ No newline at end of file
+        return self._embedder
@@ -19,7 +19,6 @@ class DocumentExtractor:
         """
         try:
             logging.info("Start the data extraction process")
-            all_extracted_data = [] # Initialize an empty list to store dictionaries
 
             # Determine document type once based on the doc_path
             doc_type = "unknown"
@@ -32,36 +31,31 @@ class DocumentExtractor:
                 if doc_type == 'doc': # Handle .doc being treated as docx
                     doc_type = 'docx'
 
-            for i, doc in enumerate(document):
-                # Extract core content for the current doc
-                text_content = doc.page_content
-                metadata = {}   # Initialize an empty metadata
-
-                # Collect metadata from the data
-                current_doc_info = doc.metadata.copy()
-                # Add the determined doc_type to this metadata
-                metadata['doc_type'] = doc_type
-                # Ensure source, page, and section are present (or default)
-                # For 'source', normalize to show only filename, not full path
-                source_path = current_doc_info.get('source', doc_path)
+            def _normalize_source(source_path):
+                # For 'source', normalize to show only filename, not full path;
+                # keep URLs as-is
                 if source_path and not source_path.startswith(('http://', 'https://')):
-                    # Extract just the filename from the path
-                    metadata['source'] = os.path.basename(source_path)
-                else:
-                    metadata['source'] = source_path  # Keep URLs as-is
-                # For 'page', prefer existing page from metadata, otherwise use index + 1
-                metadata['page'] = current_doc_info.get('page', i) + 1
-                # For 'section', use existing section from metadata, otherwise 'N/A'
-                metadata['section'] = current_doc_info.get('section', 'N/A')
+                    return os.path.basename(source_path)
+                return source_path
 
-                # Create a dictionary for the current document part and append it to the list
-                all_extracted_data.append({
-                    'text': text_content,
-                    'metadata': metadata
-                })
-                logging.info(f"Successfully, extracted text and metadata for page/part {i+1}")
+            # Build metadata with a single dict literal per page:
+            # - 'page' prefers existing page from metadata, otherwise index + 1
+            # - 'section' defaults to 'N/A' when absent
+            all_extracted_data = [
+                {
+                    'text': doc.page_content,
+                    'metadata': {
+                        'doc_type': doc_type,
+                        'source': _normalize_source(doc.metadata.get('source', doc_path)),
+                        'page': doc.metadata.get('page', i) + 1,
+                        'section': doc.metadata.get('section', 'N/A'),
+                    },
+                }
+                for i, doc in enumerate(document)
+            ]
+            logging.info("Successfully extracted text and metadata for %d page(s)/part(s)", len(all_extracted_data))
             return all_extracted_data
-            
+
         except MyException:
             logging.error("Error occur during the data extraction")
 
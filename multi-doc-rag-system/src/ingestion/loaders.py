@@ -1,8 +1,12 @@
 from langchain_community.document_loaders import PyPDFLoader, Docx2txtLoader, TextLoader, WebBaseLoader, UnstructuredMarkdownLoader
+from langchain_core.documents import Document
 from src.logger import logging
 from src.exception import MyException
+import asyncio
 import sys
 
+import aiohttp
+
 class DocumentLoader:
     def __init__(self):
         pass
@@ -17,7 +21,7 @@ class DocumentLoader:
         Raises:
             ValueError: If the document type is unsupported or the path is invalid.
         """
-        logging.info(f"Attempting to load document from: {document_path}")
+        logging.info("Attempting to load document from: %s", document_path)
         try:
             if document_path.startswith(('http://', 'https://')):
                 loader = WebBaseLoader(document_path)
@@ -33,9 +37,47 @@ class DocumentLoader:
                 raise MyException(f"Unsupported document type: {document_path}. Please provide a PDF, DOCX, TXT file, .MD file or a URL.", sys)
 
             document = loader.load()
-            logging.info(f"Successfully loaded {len(document)} pages/parts from {document_path}")
+            logging.info("Successfully loaded %d pages/parts from %s", len(document), document_path)
             return document
         except Exception as e:
-            logging.info(f"Error loading document {document_path}: {e}")
+            logging.info("Error loading document %s: %s", document_path, e)
             raise MyException(f"Could not load document {document_path}. Error: {e}", sys)
 
+    async def _fetch_urls_async(self, urls: list) -> dict:
+        """Fetch all URLs concurrently over one pooled, gzip-enabled session."""
+        connector = aiohttp.TCPConnector(limit=16)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            async def fetch(url):
+                async with session.get(url) as response:
+                    response.raise_for_status()
+                    return await response.text()
+
+            texts = await asyncio.gather(*[fetch(url) for url in urls])
+        # Keep the raw HTML; the 'web' cleaning branch strips markup later.
+        return {
+            url: [Document(page_content=text, metadata={'source': url})]
+            for url, text in zip(urls, texts)
+        }
+
+    def load_documents_bulk(self, paths: list) -> dict:
+        """
+        Loads several documents, fetching any URLs concurrently instead of one
+        synchronous GET at a time.
+        Args:
+            paths (list): Document file paths and/or URLs.
+        Returns:
+            dict: Mapping of path -> list of loaded documents.
+        """
+        loaded = {}
+        urls = [p for p in paths if p.startswith(('http://', 'https://'))]
+        if urls:
+            logging.info("Fetching %d URL(s) concurrently", len(urls))
+            try:
+                loaded.update(asyncio.run(self._fetch_urls_async(urls)))
+            except Exception as e:
+                logging.warning("Concurrent URL fetch failed (%s); falling back to sequential loading", e)
+        for path in paths:
+            if path not in loaded:
+                loaded[path] = self.load_document(path)
+        return loaded
+
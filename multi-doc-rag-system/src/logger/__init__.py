@@ -1,5 +1,6 @@
 import logging
 import os
+import sys
 from logging.handlers import RotatingFileHandler
 from from_root import from_root
 from datetime import datetime
@@ -39,34 +40,19 @@ def configure_logger():
         file_handler.setFormatter(formatter)
         file_handler.setLevel(logging.DEBUG)
         
-        # Console handler with Unicode error handling
-        class SafeStreamHandler(logging.StreamHandler):
-            """StreamHandler that safely handles Unicode encoding errors on Windows."""
-            def emit(self, record):
-                try:
-                    msg = self.format(record)
-                    stream = self.stream
-                    # Try to write normally first
-                    try:
-                        stream.write(msg + self.terminator)
-                        self.flush()
-                    except (UnicodeEncodeError, UnicodeDecodeError):
-                        # If encoding fails, sanitize the message by replacing problematic characters
-                        # This ensures Windows console (cp1252) can handle the output
-                        safe_msg = msg.encode('ascii', errors='replace').decode('ascii')
-                        try:
-                            stream.write(safe_msg + self.terminator)
-                            self.flush()
-                        except Exception:
-                            # Last resort: write a simplified message
-                            safe_msg_simple = f"[Log message contains non-ASCII characters: {record.levelname}]"
-                            stream.write(safe_msg_simple + self.terminator)
-                            self.flush()
-                except Exception:
-                    self.handleError(record)
-        
-        console_handler = SafeStreamHandler()
-        console_handler.setFormatter(formatter)
+        # Reconfigure stderr once to UTF-8 with a lossless fallback instead of
+        # catching UnicodeEncodeError on every record (the old SafeStreamHandler
+        # paid a try/except + encode round-trip per emit). Covers the Windows
+        # cp1252 console case; streams without reconfigure() are left as-is.
+        try:
+            sys.stderr.reconfigure(encoding='utf-8', errors='backslashreplace')
+        except (AttributeError, ValueError):
+            pass
+
+        console_handler = logging.StreamHandler()
+        # No asctime on the console: formatting the timestamp costs a
+        # strftime call per record and the file handler already records it.
+        console_handler.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
         console_handler.setLevel(logging.INFO)
         
         # Add handlers to the logger
@@ -3,7 +3,49 @@ from src.utils.main_utils import num_tokens_from_string
 from langchain_core.documents import Document
 from src.logger import logging
 from src.exception import MyException
+import functools
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import tiktoken
+
+
+@functools.lru_cache(maxsize=16)
+def _get_structural_splitter(doc_type: str) -> RecursiveCharacterTextSplitter:
+    """
+    Return a reusable splitter for the initial structural pass. Splitters are
+    cached per doc_type so their internal separator regexes are compiled once
+    instead of on every page.
+    """
+    if doc_type == 'txt':
+        separators = ['\n\n', '\n', ' ', ''] # Prioritize paragraphs for plain text
+    # Add more conditions for other document types if needed (e.g., 'md', 'web')
+    # For simplicity, using same separators for now but can be customized later.
+    else:
+        separators = ['\n\n', '\n', ' ', ''] # Default separators
+
+    # Larger chunk_size and no overlap for initial structural split
+    return RecursiveCharacterTextSplitter(
+        separators=separators,
+        chunk_size=2000,  # Larger chunks for initial structural split
+        chunk_overlap=0,
+        length_function=len, # Character count for initial split
+        add_start_index=True,
+        is_separator_regex=False,
+    )
+
+
+@functools.lru_cache(maxsize=16)
+def _get_sub_splitter(target_chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+    """Return a reusable token-length splitter for oversized structural chunks."""
+    return RecursiveCharacterTextSplitter(
+        chunk_size=target_chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=num_tokens_from_string, # Use token counting
+        add_start_index=True,
+    )
+
 
 class DocumentChunker:
     def __init__(self):
@@ -27,25 +69,10 @@ class DocumentChunker:
             metadata = extracted_doc_dict['metadata']
             doc_type = metadata['doc_type']
 
-            logging.info(f"Applying structure-aware splitting for document type: {doc_type}")
+            logging.info("Applying structure-aware splitting for document type: %s", doc_type)
 
-            # Define separators based on document type
-            if doc_type == 'txt':
-                separators = ['\n\n', '\n', ' ', ''] # Prioritize paragraphs for plain text
-            # Add more conditions for other document types if needed (e.g., 'md', 'web')
-            # For simplicity, using same separators for now but can be customized later.
-            else:
-                separators = ['\n\n', '\n', ' ', ''] # Default separators
-
-            # Initialize RecursiveCharacterTextSplitter for initial structural chunks
-            # Larger chunk_size and no overlap for initial structural split
-            text_splitter = RecursiveCharacterTextSplitter(
-                separators=separators,
-                chunk_size=2000,  # Larger chunks for initial structural split
-                chunk_overlap=0,
-                length_function=len, # Character count for initial split
-                add_start_index=True
-            )
+            # Reuse the cached splitter for this document type
+            text_splitter = _get_structural_splitter(doc_type)
 
             # Split the document's text
             # The splitter expects a list of Document objects, so create one from the raw text.
@@ -62,7 +89,7 @@ class DocumentChunker:
                     'text': split_doc.page_content,
                     'metadata': chunk_metadata
                 })
-            logging.info(f"Original text split into {len(formatted_chunks)} structural chunks.")
+            logging.info("Original text split into %d structural chunks.", len(formatted_chunks))
             return formatted_chunks
         except Exception as e:
             raise MyException(e, sys)
@@ -84,22 +111,35 @@ class DocumentChunker:
         try:
             refined_chunks = []
 
-            logging.info(f"Applying length-based refinement with target_chunk_size={target_chunk_size} and chunk_overlap={chunk_overlap}.")
+            logging.info("Applying length-based refinement with target_chunk_size=%s and chunk_overlap=%s.", target_chunk_size, chunk_overlap)
+
+            # Cheap pre-filter: at ~4 chars per token, chunks well under the
+            # target cannot exceed it, so only borderline chunks are tokenized
+            # exactly — in one batch, since tiktoken's Rust core releases the
+            # GIL and encode_batch scales across threads.
+            approx_tokens = [len(c['text']) // 4 for c in structural_chunks]
+            needs_exact = [
+                i for i, approx in enumerate(approx_tokens)
+                if approx > 0.8 * target_chunk_size
+            ]
+            exact_counts = {}
+            if needs_exact:
+                encoding = tiktoken.get_encoding("cl100k_base")
+                encoded = encoding.encode_batch(
+                    [structural_chunks[i]['text'] for i in needs_exact],
+                    num_threads=os.cpu_count() or 1,
+                )
+                exact_counts = {i: len(ids) for i, ids in zip(needs_exact, encoded)}
 
             for i, structural_chunk in enumerate(structural_chunks):
                 text = structural_chunk['text']
                 metadata = structural_chunk['metadata'].copy()
-                current_chunk_tokens = num_tokens_from_string(text)
+                current_chunk_tokens = exact_counts.get(i, approx_tokens[i])
 
                 if current_chunk_tokens > target_chunk_size:
-                    print(f"  Chunk {i} (original tokens: {current_chunk_tokens}) exceeds target. Further splitting...")
-                    # Create a new splitter for this sub-splitting process
-                    sub_splitter = RecursiveCharacterTextSplitter(
-                        chunk_size=target_chunk_size,
-                        chunk_overlap=chunk_overlap,
-                        length_function=num_tokens_from_string, # Use token counting
-                        add_start_index=True
-                    )
+                    logging.debug("Chunk %d (original tokens: %d) exceeds target. Further splitting...", i, current_chunk_tokens)
+                    # Reuse the cached splitter for this size/overlap pair
+                    sub_splitter = _get_sub_splitter(target_chunk_size, chunk_overlap)
                     # Convert the structural chunk into a Document object for the splitter
                     doc_to_split = Document(page_content=text, metadata=metadata)
                     sub_documents = sub_splitter.split_documents([doc_to_split])
@@ -113,10 +153,9 @@ class DocumentChunker:
                             'metadata': sub_chunk_metadata
                         })
                 else:
-                    print(f"  Chunk {i} (tokens: {current_chunk_tokens}) is within target. Adding directly.")
                     refined_chunks.append(structural_chunk)
 
-            logging.info(f"Total refined chunks after length-based refinement: {len(refined_chunks)}")
+            logging.info("Total refined chunks after length-based refinement: %d", len(refined_chunks))
             return refined_chunks
         except Exception as e:
             raise MyException(e, sys)
@@ -138,20 +177,42 @@ class DocumentChunker:
         logging.info("Starting document chunking process...")
         all_final_chunks = []
         try:
-            for i, extracted_doc_dict in enumerate(cleaned_doc_list):
-                print(f"Processing document {i+1}/{len(cleaned_doc_list)} for chunking...")
-                # Step 1: Perform structure-aware splitting
-                structural_chunks = self.structure_aware_splitter(extracted_doc_dict)
-
-                # Step 2: Perform length-based refinement
-                refined_chunks = self.length_based_refinement(
-                    structural_chunks,
-                    target_chunk_size=target_chunk_size,
-                    chunk_overlap=chunk_overlap
-                )
-                all_final_chunks.extend(refined_chunks)
+            if len(cleaned_doc_list) > 1:
+                # Splitting + token counting are CPU-bound pure Python and each
+                # document is independent, so fan out across processes to
+                # sidestep the GIL. A single document stays in-process to
+                # avoid pool startup overhead.
+                max_workers = min(os.cpu_count() or 1, len(cleaned_doc_list))
+                work_items = [
+                    (extracted_doc_dict, target_chunk_size, chunk_overlap)
+                    for extracted_doc_dict in cleaned_doc_list
+                ]
+                with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                    for refined_chunks in executor.map(_chunk_one, work_items):
+                        all_final_chunks.extend(refined_chunks)
+            else:
+                for i, extracted_doc_dict in enumerate(cleaned_doc_list):
+                    logging.debug("Processing document %d/%d for chunking...", i + 1, len(cleaned_doc_list))
+                    all_final_chunks.extend(
+                        _chunk_one((extracted_doc_dict, target_chunk_size, chunk_overlap))
+                    )
 
-            logging.info(f"Document chunking process completed. Generated {len(all_final_chunks)} total final chunks from all documents.")
+            logging.info("Document chunking process completed. Generated %d total final chunks from all documents.", len(all_final_chunks))
             return all_final_chunks
         except Exception as e:
             raise MyException(e, sys)
+
+
+def _chunk_one(args: tuple) -> list:
+    """
+    Chunk a single cleaned document (structure-aware split + length-based
+    refinement). Module-level so it is picklable for ProcessPoolExecutor.
+    """
+    extracted_doc_dict, target_chunk_size, chunk_overlap = args
+    chunker = DocumentChunker()
+    structural_chunks = chunker.structure_aware_splitter(extracted_doc_dict)
+    return chunker.length_based_refinement(
+        structural_chunks,
+        target_chunk_size=target_chunk_size,
+        chunk_overlap=chunk_overlap
+    )
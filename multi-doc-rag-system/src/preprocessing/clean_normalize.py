@@ -1,9 +1,34 @@
 import re
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from concurrent.futures import ProcessPoolExecutor
 from src.logger import logging
 from src.exception import MyException
 import os, sys
 
+# Precompiled once at import: these run on every document, and compiling (or
+# even re.cache lookups) per call adds up across a corpus.
+_RE_TABS = re.compile(r"[ \t]+")
+_RE_BLANK_LINES = re.compile(r"\n\s*\n\s*\n+")
+_RE_NEWLINE_WS = re.compile(r"[ \t]*\n[ \t]*")
+_RE_MULTI_SPACE = re.compile(r" {2,}")
+
+# Markdown cleaning fused into two passes instead of six full-string rewrites:
+# one pass strips line-level markers (headers, blockquotes, list bullets), a
+# second unwraps inline markup (bold/italic, links, inline code).
+_MD_LINE_MARKERS = re.compile(r'^(?:#+\s*|>\s?|[\-*+]\s?)', re.MULTILINE)
+_MD_INLINE = re.compile(r'(\*{1,2}|_{1,2})(.*?)\1|\[(.*?)\]\([^)]*\)|`(.*?)`')
+
+
+def _md_inline_repl(match: re.Match) -> str:
+    """Keep the display text of whichever inline construct matched."""
+    return match.group(2) or match.group(3) or match.group(4) or ''
+
+# Skip script/style subtrees while parsing instead of extracting them later;
+# with the strainer the web branch is a single parse + get_text pass, no
+# mutating .extract() walk over the built tree.
+_WEB_STRAINER = SoupStrainer(lambda name, attrs: name not in ('script', 'style'))
+
+
 class DocumentNormalizationAndCleaning:
     def __init__(self):
         pass
@@ -21,13 +46,13 @@ class DocumentNormalizationAndCleaning:
         # Normalize Windows-style newlines
         text = text.replace("\r\n", "\n").replace("\r", "\n")
         # Collapse tabs into spaces
-        text = re.sub(r"[ \t]+", " ", text)
+        text = _RE_TABS.sub(" ", text)
         # Collapse 3+ blank lines into just 2 (paragraph separation)
-        text = re.sub(r"\n\s*\n\s*\n+", "\n\n", text)
+        text = _RE_BLANK_LINES.sub("\n\n", text)
         # Remove extra spaces around newlines
-        text = re.sub(r"[ \t]*\n[ \t]*", "\n", text)
+        text = _RE_NEWLINE_WS.sub("\n", text)
         # Finally, collapse multiple spaces again (in case we introduced any)
-        text = re.sub(r" {2,}", " ", text)
+        text = _RE_MULTI_SPACE.sub(" ", text)
         # Strip leading/trailing whitespace
         text = text.strip()
 
@@ -59,30 +84,22 @@ class DocumentNormalizationAndCleaning:
 
             if doc_type == 'md':
                 print("Applying Markdown specific cleaning...")
-                # Remove Markdown headers (e.g., # Header 1)
-                cleaned_text = re.sub(r'^#+\s*(.*)$', r'\1', cleaned_text, flags=re.MULTILINE)
-                # Remove bold and italic formatting
-                cleaned_text = re.sub(r'(\S*?)(\*{1,2}|_{1,2})(.*?)\2', r'\1\3', cleaned_text) # Bold/Italic
-                # Remove links (display text only)
-                cleaned_text = re.sub(r'\[(.*?)\]\(.*\)', r'\1', cleaned_text)
-                # Remove inline code blocks
-                cleaned_text = re.sub(r'`(.*?)`', r'\1', cleaned_text)
-                # Remove block quotes
-                cleaned_text = re.sub(r'^>\s?', '', cleaned_text, flags=re.MULTILINE)
-                # Remove list markers
-                cleaned_text = re.sub(r'^[\-*+]\s?', '', cleaned_text, flags=re.MULTILINE)
-                # Remove emojis
-                cleaned_text = re.sub(r'[^\x00-\x7F]+', '', cleaned_text)
+                # Strip line-level markers (headers, blockquotes, list markers)
+                cleaned_text = _MD_LINE_MARKERS.sub('', cleaned_text)
+                # Unwrap inline markup (bold/italic, links, inline code)
+                cleaned_text = _MD_INLINE.sub(_md_inline_repl, cleaned_text)
+                # Remove emojis: a C-level ascii encode/decode round trip is
+                # much faster than a regex sweep for stripping non-ASCII.
+                cleaned_text = cleaned_text.encode('ascii', 'ignore').decode('ascii')
             elif doc_type == 'web':
                 print("Applying Web specific cleaning with BeautifulSoup...")
-                soup = BeautifulSoup(raw_text, 'html.parser')
-
-                # Remove script and style elements
-                for script_or_style in soup(['script', 'style']):
-                    script_or_style.extract() # Remove them from the soup
+                # lxml parses several times faster than html.parser, and the
+                # strainer drops script/style during the parse itself, so no
+                # post-hoc .extract() tree walk is needed.
+                soup = BeautifulSoup(raw_text, 'lxml', parse_only=_WEB_STRAINER)
 
                 # Get text
-                cleaned_text = soup.get_text()
+                cleaned_text = soup.get_text(' ', strip=True)
             else: # General text (pdf, docx, txt). No specific structural cleaning needed before normalization.
                 print(f"No specific structural cleaning for {doc_type}. Applying general text normalization.")
                 cleaned_text = raw_text
@@ -94,9 +111,22 @@ class DocumentNormalizationAndCleaning:
         return cleaned_document_list
     
     def initialize_document_normalizer(self, extracted_doc: list):
-        # first, clean the extracted document structure
-        cleaned_document = self.clean_document_structure(extracted_doc)
-        # second, normalize the document text
-        for cleaned_doc_dict in cleaned_document:
-            cleaned_doc_dict["text"] = self.normalize_text(cleaned_doc_dict["text"])
-        return cleaned_document
+        # Per-document cleaning is CPU-bound regex/HTML work with no shared
+        # state, so fan it out across processes when there is more than one
+        # part. A single part stays in-process to avoid pool startup cost.
+        if len(extracted_doc) > 1:
+            with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+                return list(executor.map(_clean_one, extracted_doc, chunksize=4))
+        return [_clean_one(doc_dict) for doc_dict in extracted_doc]
+
+
+def _clean_one(extracted_doc_dict: dict) -> dict:
+    """
+    Clean and normalize a single extracted document part (structure-specific
+    cleaning followed by text normalization). Module-level so it is picklable
+    for ProcessPoolExecutor.
+    """
+    cleaner = DocumentNormalizationAndCleaning()
+    cleaned_doc_dict = cleaner.clean_document_structure([extracted_doc_dict])[0]
+    cleaned_doc_dict["text"] = cleaner.normalize_text(cleaned_doc_dict["text"])
+    return cleaned_doc_dict
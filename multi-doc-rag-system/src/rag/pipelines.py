@@ -1,11 +1,19 @@
+import asyncio
+import hashlib
 import os
+import queue
 import sys
+import threading
+from collections import OrderedDict
 from typing import Dict, List, Sequence, Any
 
+import tiktoken
 from langchain_ollama import ChatOllama
 from langchain_core.documents import Document
 from langchain_core.messages import SystemMessage, HumanMessage
+from langchain_community.vectorstores import FAISS
 
+from src.embedding.embedder import OllamaEmbedder
 from src.exception import MyException
 from src.ingestion.extractor import DocumentExtractor
 from src.ingestion.loaders import DocumentLoader
@@ -16,13 +24,16 @@ from src.rag import prompts
 from src.retrieval.reranker import CrossEncoderReranker
 from src.retrieval.retriever import RerankMMRRetriever
 from src.utils.main_utils import (
-    num_tokens_from_string,
     load_configs,
     build_context,
     extract_sources,
 )
 from src.vectorstore.faiss_store import FaissVectorStore
 
+# Loaded once at import: tiktoken rebuilds the BPE ranks on every
+# get_encoding call, which is far more expensive than the encode itself.
+_TOKEN_ENCODING = tiktoken.get_encoding("cl100k_base")
+
 
 class RAGPipeline:
     """
@@ -46,6 +57,13 @@ class RAGPipeline:
         if max_tokens:
             llm_kwargs["num_predict"] = max_tokens  # Ollama uses num_predict for max tokens
         self.llm = ChatOllama(**llm_kwargs)
+        # LRU cache of LLM answers keyed by a digest of the message contents:
+        # identical retrieval context + question means the generation call
+        # can be skipped entirely on repeat.
+        self._llm_cache: OrderedDict[bytes, str] = OrderedDict()
+        self._llm_cache_max_size = 128
+        # SYSTEM_PROMPT is constant, so build its message object once
+        self._system_msg = SystemMessage(content=prompts.SYSTEM_PROMPT)
 
         retr_cfg = self.config.get("retrieval", {})
         self.reranker = CrossEncoderReranker(
@@ -77,41 +95,139 @@ class RAGPipeline:
             cleaner = DocumentNormalizationAndCleaning()
             chunker = DocumentChunker()
 
-            # Process each document
-            all_chunks = []
+            # Prefetch everything up front; URLs are fetched concurrently
+            enabled_paths = [
+                doc_info["path"] for doc_info in docs_cfg if doc_info.get("enabled", True)
+            ]
+            loaded_by_path = loader.load_documents_bulk(enabled_paths)
+
+            # Run extract -> clean -> chunk as pipelined stages connected by
+            # small bounded queues: each stage works on a different document
+            # concurrently, and the bounded size applies backpressure so no
+            # stage can run far ahead of its consumer. None is the shutdown
+            # sentinel, forwarded stage to stage.
+            clean_q: queue.Queue = queue.Queue(maxsize=4)
+            chunk_q: queue.Queue = queue.Queue(maxsize=4)
+            errors: list = []
+
+            # Instead of materializing every chunk of every document before
+            # the first embed call, flush chunks into FAISS in fixed-size
+            # batches as the chunker produces them: peak memory stays at one
+            # batch and embedding overlaps with the remaining chunking work.
+            retr_cfg = self.config.get("retrieval", {})
+            faiss_builder = FaissVectorStore(
+                quantize=retr_cfg.get("quantize_index", True)
+            )
+            flush_batch_size = 256
+            chunk_buffer: list = []
+            total_chunks = 0
+            self.vector_store = None
+            self.retriever = None
+
+            def _flush_chunks():
+                nonlocal total_chunks
+                if not chunk_buffer:
+                    return
+                if self.vector_store is None:
+                    self.vector_store = faiss_builder.create_vector_store(chunk_buffer)
+                else:
+                    self.vector_store.add_texts(
+                        [chunk["text"] for chunk in chunk_buffer],
+                        metadatas=[chunk["metadata"] for chunk in chunk_buffer],
+                    )
+                total_chunks += len(chunk_buffer)
+                logging.info("Flushed %d chunks into vector store (total: %d)",
+                             len(chunk_buffer), total_chunks)
+                chunk_buffer.clear()
+
+            def _extract_stage():
+                while (item := clean_q.get()) is not None:
+                    path, loaded = item
+                    try:
+                        chunk_q.put((path, cleaner.initialize_document_normalizer(
+                            extractor.extract_document_info(loaded, path))))
+                    except Exception as e:
+                        errors.append((path, e))
+                chunk_q.put(None)
+
+            def _chunk_stage():
+                while (item := chunk_q.get()) is not None:
+                    path, cleaned = item
+                    try:
+                        chunks = chunker.chunk_document(cleaned, target_chunk_size, chunk_overlap)
+                        logging.info("Generated %d chunks from document: %s", len(chunks), path)
+                        chunk_buffer.extend(chunks)
+                        if len(chunk_buffer) >= flush_batch_size:
+                            _flush_chunks()
+                    except Exception as e:
+                        errors.append((path, e))
+
+            stage_threads = [
+                threading.Thread(target=stage, daemon=True)
+                for stage in (_extract_stage, _chunk_stage)
+            ]
+            for stage_thread in stage_threads:
+                stage_thread.start()
+
             for idx, doc_info in enumerate(docs_cfg, 1):
                 if not doc_info.get("enabled", True):
                     logging.info("Skipping disabled document: %s", doc_info.get("path", "unknown"))
                     continue
-                
+
                 path = doc_info["path"]
                 logging.info("[%d/%d] Processing document: %s", idx, len(docs_cfg), path)
+                clean_q.put((path, loaded_by_path[path]))
+            clean_q.put(None)
+
+            for stage_thread in stage_threads:
+                stage_thread.join()
+
+            if errors:
+                path, e = errors[0]
+                logging.error("Failed to process document %s: %s", path, e)
+                self.vector_store = None
+                raise MyException(f"Error processing document {path}: {e}", sys)
+
+            # Flush whatever is left below one batch
+            _flush_chunks()
 
-                try:
-                    # Pipeline: load -> extract -> clean -> chunk
-                    loaded = loader.load_document(path)
-                    extracted = extractor.extract_document_info(loaded, path)
-                    cleaned = cleaner.initialize_document_normalizer(extracted)
-                    chunks = chunker.chunk_document(cleaned, target_chunk_size, chunk_overlap)
-                    
-                    logging.info("Generated %d chunks from document: %s", len(chunks), path)
-                    all_chunks.extend(chunks)
-                except Exception as e:
-                    logging.error("Failed to process document %s: %s", path, e)
-                    raise MyException(f"Error processing document {path}: {e}", sys)
-
-            if not all_chunks:
+            if total_chunks == 0:
                 raise MyException("No chunks generated; check document config and ensure documents are enabled.", sys)
 
-            # Create vector store and retriever
-            logging.info("Creating vector store with %d total chunks...", len(all_chunks))
-            self.vector_store = FaissVectorStore().create_vector_store(all_chunks)
             self.retriever = RerankMMRRetriever(self.vector_store, self.reranker)
-            logging.info("Vector store prepared successfully with %d chunks", len(all_chunks))
+            logging.info("Vector store prepared successfully with %d chunks", total_chunks)
         except Exception as e:
             logging.exception("Failed to prepare vector store: %s", e)
             raise MyException(e, sys)
 
+    def save_vector_store(self, path: str) -> None:
+        """Persist the current FAISS vector store to disk for reuse across restarts."""
+        if self.vector_store is None:
+            raise MyException("No vector store to save.", sys)
+        self.vector_store.save_local(path)
+        logging.info("Vector store saved to %s", path)
+
+    def load_vector_store(self, path: str) -> bool:
+        """
+        Load a previously saved FAISS vector store and rebuild the retriever.
+        Returns True on success, False if the path is missing or loading fails.
+        """
+        if not os.path.isdir(path):
+            return False
+        try:
+            embedder = OllamaEmbedder().get_embedder()
+            self.vector_store = FAISS.load_local(
+                path, embedder, allow_dangerous_deserialization=True
+            )
+            self.retriever = RerankMMRRetriever(self.vector_store, self.reranker)
+            logging.info("Loaded cached vector store from %s", path)
+            return True
+        except Exception as e:
+            logging.warning("Failed to load cached vector store from %s: %s", path, e)
+            self.vector_store = None
+            self.retriever = None
+            return False
+
     # ----------------------------
     # Retrieval + Routing
     # ----------------------------
@@ -158,12 +274,15 @@ class RAGPipeline:
             gen_cfg = self.config.get("generation", {})
             token_limit = gen_cfg.get("stuff_context_token_limit")
             
-            total_tokens = sum(num_tokens_from_string(doc.page_content) for doc in documents)
+            # Build the context once and tokenize the joined string in a
+            # single encode call rather than running the tokenizer per doc.
+            context_str = build_context(documents, include_citations=False)
+            total_tokens = len(_TOKEN_ENCODING.encode(context_str))
             logging.info("Total context tokens: %d (limit: %d)", total_tokens, token_limit)
-            
+
             # Choose strategy based on token count
             if total_tokens <= token_limit:
-                answer = self._answer_with_stuff(query, documents)
+                answer = self._answer_with_stuff(query, context_str)
             else:
                 answer = self._answer_with_map_reduce(query, documents)
             
@@ -175,29 +294,93 @@ class RAGPipeline:
             logging.exception("Failed to generate answer: %s", e)
             raise MyException(e, sys)
 
+    def answer_with_sources_stream(self, query: str):
+        """
+        Stream an answer for a query, yielding (text_delta, sources) pairs.
+
+        Text deltas arrive with sources=None as the LLM produces them; the
+        final item carries an empty delta and the extracted sources. The
+        map-reduce path cannot stream its intermediate calls, so it yields
+        the full answer as one delta.
+        """
+        try:
+            query_preview = query[:100] if len(query) > 100 else query
+            logging.info("Streaming answer for query: %s", query_preview)
+
+            documents = self.retrieve(query)
+            if not documents:
+                logging.warning("No documents retrieved for query: %s", query)
+                yield ("I don't have enough information to answer this question based on the provided documents.", None)
+                yield ("", [])
+                return
+
+            gen_cfg = self.config.get("generation", {})
+            token_limit = gen_cfg.get("stuff_context_token_limit")
+
+            context_str = build_context(documents, include_citations=False)
+            total_tokens = len(_TOKEN_ENCODING.encode(context_str))
+            logging.info("Total context tokens: %d (limit: %d)", total_tokens, token_limit)
+
+            answer_parts: List[str] = []
+            if total_tokens <= token_limit:
+                messages = [
+                    self._system_msg,
+                    HumanMessage(content=prompts.format_stuff(context_str, query))
+                ]
+                for chunk in self.llm.stream(messages):
+                    delta = chunk.content
+                    if delta:
+                        answer_parts.append(delta)
+                        yield (delta, None)
+            else:
+                answer = self._answer_with_map_reduce(query, documents)
+                answer_parts.append(answer)
+                yield (answer, None)
+
+            answer = "".join(answer_parts)
+            sources = extract_sources(documents, answer_text=answer)
+            logging.info("Streamed answer complete (length: %d chars, sources: %d)", len(answer), len(sources))
+            yield ("", sources)
+        except Exception as e:
+            logging.exception("Failed to stream answer: %s", e)
+            raise MyException(e, sys)
+
     # ----------------------------
     # Prompting strategies
     # ----------------------------
-    def _answer_with_stuff(self, query: str, docs: Sequence[Document]) -> str:
+    def _invoke_cached(self, messages: List[Any]) -> str:
+        """Invoke the LLM, serving repeats of an identical message list from cache."""
+        hasher = hashlib.blake2b(digest_size=16)
+        for message in messages:
+            hasher.update(message.content.encode("utf-8"))
+            hasher.update(b"\x00")
+        key = hasher.digest()
+
+        cached = self._llm_cache.get(key)
+        if cached is not None:
+            self._llm_cache.move_to_end(key)
+            logging.info("LLM response served from cache")
+            return cached
+
+        # ChatOllama always returns an AIMessage, so .content is safe
+        answer = self.llm.invoke(messages).content
+        self._llm_cache[key] = answer
+        if len(self._llm_cache) > self._llm_cache_max_size:
+            self._llm_cache.popitem(last=False)
+        return answer
+
+    def _answer_with_stuff(self, query: str, context_str: str) -> str:
         """Generate answer using Stuff strategy (all context in one prompt)."""
-        # Build context without citations for clean answer
-        context_str = build_context(docs, include_citations=False)
-        
         # Build the user prompt
-        prompt_tpl = prompts.build_stuff_prompt()
-        user_prompt = prompt_tpl.format(
-            context=context_str,
-            question=query
-        )
-        
+        user_prompt = prompts.format_stuff(context_str, query)
+
         # Use proper message format for ChatOllama
         messages = [
-            SystemMessage(content=prompts.SYSTEM_PROMPT),
+            self._system_msg,
             HumanMessage(content=user_prompt)
         ]
         
-        logging.info("Using Stuff strategy with %d docs", len(docs))
-        logging.info("Context length: %d characters", len(context_str))
+        logging.info("Using Stuff strategy (context: %d characters)", len(context_str))
         # Sanitize context preview for logging to avoid Unicode encoding issues
         try:
             context_preview = context_str[:300].encode('ascii', errors='replace').decode('ascii')
@@ -205,8 +388,7 @@ class RAGPipeline:
         except Exception:
             logging.debug("Context preview: [contains non-ASCII characters, length: %d]", len(context_str))
         
-        response = self.llm.invoke(messages)
-        answer = getattr(response, "content", str(response))
+        answer = self._invoke_cached(messages)
         logging.info("Generated answer length: %d characters", len(answer))
         # Sanitize answer preview for logging
         try:
@@ -218,58 +400,39 @@ class RAGPipeline:
 
     def _answer_with_map_reduce(self, query: str, docs: Sequence[Document]) -> str:
         """Generate answer using Map-Reduce strategy (process each doc, then combine)."""
-        map_tpl = prompts.build_map_prompt()
-        map_outputs = []
         logging.info("Using Map-Reduce strategy with %d docs", len(docs))
-        
-        # Map: process each document individually (without citations in context)
-
-        # Build the whole chunks context
-        context_str = build_context(docs, include_citations=False)
-        logging.info("Total context length for Map-Reduce: %d characters", len(context_str))
-        # Map: process all doc together
-        map_user_prompt = map_tpl.format(
-            context=context_str,
-            question=query
-        )
-        map_messages = [
-            SystemMessage(content=prompts.SYSTEM_PROMPT),
-            HumanMessage(content=map_user_prompt)
-        ]
-        res = self.llm.invoke(map_messages)
-        map_res = getattr(res, "content", str(res))
-        # for idx, doc in enumerate(docs, 1):
-        #     ctx = doc.page_content  # Use clean content without citations
-        #     map_user_prompt = map_tpl.format(
-        #         context=ctx,
-        #         question=query
-        #     )
-            
-        #     map_messages = [
-        #         SystemMessage(content=prompts.SYSTEM_PROMPT),
-        #         HumanMessage(content=map_user_prompt)
-        #     ]
-            
-        #     res = self.llm.invoke(map_messages)
-        #     map_output = getattr(res, "content", str(res))
-        #     map_outputs.append(map_output)
-        #     logging.debug("Map output %d/%d: %d chars", idx, len(docs), len(map_output))
+
+        # Map: process each document individually (without citations in
+        # context). The calls are independent, so dispatch them concurrently
+        # and let the backend batch; the semaphore caps in-flight requests
+        # so a large doc set cannot overwhelm it.
+        async def _run_map_phase() -> List[str]:
+            semaphore = asyncio.Semaphore(8)
+
+            async def _map_one(doc: Document) -> str:
+                map_messages = [
+                    self._system_msg,
+                    HumanMessage(content=prompts.format_map(doc.page_content, query))
+                ]
+                async with semaphore:
+                    res = await self.llm.ainvoke(map_messages)
+                return res.content
+
+            return list(await asyncio.gather(*(_map_one(doc) for doc in docs)))
+
+        map_outputs = asyncio.run(_run_map_phase())
+        for idx, map_output in enumerate(map_outputs, 1):
+            logging.debug("Map output %d/%d: %d chars", idx, len(docs), len(map_output))
 
         # Reduce: combine all map outputs
-        reduce_tpl = prompts.build_reduce_prompt()
-        reduce_user_prompt = reduce_tpl.format(
-            # map_summaries="\n\n".join(map_outputs),
-            map_summaries=map_res,
-            question=query,
-        )
+        reduce_user_prompt = prompts.format_reduce("\n\n".join(map_outputs), query)
         
         reduce_messages = [
-            SystemMessage(content=prompts.SYSTEM_PROMPT),
+            self._system_msg,
             HumanMessage(content=reduce_user_prompt)
         ]
         
-        reduced = self.llm.invoke(reduce_messages)
-        answer = getattr(reduced, "content", str(reduced))
+        answer = self._invoke_cached(reduce_messages)
         logging.info("Map-Reduce answer generated: %d characters", len(answer))
         return answer
 
@@ -13,10 +13,10 @@ Do not include citations or source references in your answer - sources will be p
 Only say "I don't know" if the context does not contain any relevant information to answer the question.
 """.strip()
 
-
-def build_stuff_prompt() -> PromptTemplate:
-    """Prompt for the simple Stuff strategy (small context)."""
-    template = """Context:
+# Templates are immutable, so they live as plain module-level strings and the
+# hot path formats them with str.format directly; PromptTemplate re-parses
+# the template and re-validates input_variables on every format call.
+STUFF_TEMPLATE = """Context:
     {context}
 
     Question: {question}
@@ -26,14 +26,8 @@ def build_stuff_prompt() -> PromptTemplate:
     Be precise and avoid unnecessary details or elaboration.
     Only say "I don't know" if the context does not contain any information that relates to the question.
     Do not include citations or source references in your answer.""".strip()
-    return PromptTemplate(
-        input_variables=["context", "question"], template=template
-    )
 
-
-def build_map_prompt() -> PromptTemplate:
-    """Prompt for the map step of Map-Reduce."""
-    template = """Context chunk:
+MAP_TEMPLATE = """Context chunk:
     {context}
 
     Question: {question}
@@ -43,14 +37,8 @@ def build_map_prompt() -> PromptTemplate:
     Be selective - include only what's directly relevant to the question.
     If this chunk contains relevant information, extract it concisely. Only return "No relevant information" if this chunk truly has nothing related to the question.
     Do not include citations or source references.""".strip()
-    return PromptTemplate(
-        input_variables=["context", "question"], template=template
-    )
 
-
-def build_reduce_prompt() -> PromptTemplate:
-    """Prompt for the reduce step of Map-Reduce."""
-    template = """You received the following partial answers from different context chunks:
+REDUCE_TEMPLATE = """You received the following partial answers from different context chunks:
     {map_summaries}
 
     Question: {question}
@@ -60,8 +48,40 @@ def build_reduce_prompt() -> PromptTemplate:
     Be brief and to-the-point - avoid repetition and unnecessary details.
     Only say "I don't know" if none of the partial answers contain any information related to the question.
     Do not include citations or source references.""".strip()
+
+
+def format_stuff(context: str, question: str) -> str:
+    """Format the Stuff prompt (small context)."""
+    return STUFF_TEMPLATE.format(context=context, question=question)
+
+
+def format_map(context: str, question: str) -> str:
+    """Format the map-step prompt of Map-Reduce."""
+    return MAP_TEMPLATE.format(context=context, question=question)
+
+
+def format_reduce(map_summaries: str, question: str) -> str:
+    """Format the reduce-step prompt of Map-Reduce."""
+    return REDUCE_TEMPLATE.format(map_summaries=map_summaries, question=question)
+
+
+def build_stuff_prompt() -> PromptTemplate:
+    """PromptTemplate wrapper around the Stuff template for langchain consumers."""
     return PromptTemplate(
-        input_variables=["map_summaries", "question"],
-        template=template,
+        input_variables=["context", "question"], template=STUFF_TEMPLATE
     )
 
+
+def build_map_prompt() -> PromptTemplate:
+    """PromptTemplate wrapper around the map template for langchain consumers."""
+    return PromptTemplate(
+        input_variables=["context", "question"], template=MAP_TEMPLATE
+    )
+
+
+def build_reduce_prompt() -> PromptTemplate:
+    """PromptTemplate wrapper around the reduce template for langchain consumers."""
+    return PromptTemplate(
+        input_variables=["map_summaries", "question"],
+        template=REDUCE_TEMPLATE,
+    )
@@ -1,3 +1,4 @@
+import hashlib
 import sys
 from typing import List, Sequence
 
@@ -30,6 +31,12 @@ class RerankMMRRetriever:
         self.vector_store = vector_store
         self.reranker = reranker
         self.embedder = embedder or getattr(vector_store, "embedding_function", None)
+        # Reverse map docstore id -> index row so MMR can fetch the vectors
+        # already computed at indexing time instead of re-embedding.
+        self._row_by_doc_id = {
+            doc_id: row
+            for row, doc_id in getattr(vector_store, "index_to_docstore_id", {}).items()
+        }
 
         if self.embedder is None:
             raise MyException("No embedding function available for MMR.", sys)
@@ -107,6 +114,24 @@ class RerankMMRRetriever:
                 initial_k_final,
             )
 
+            # Duplicate content (re-ingested files, overlapping chunks) wastes
+            # cross-encoder passes; keep only the first of each distinct text.
+            seen_digests = set()
+            unique_docs = []
+            for doc in initial_docs:
+                digest = hashlib.blake2b(
+                    doc.page_content.encode("utf-8"), digest_size=16
+                ).digest()
+                if digest not in seen_digests:
+                    seen_digests.add(digest)
+                    unique_docs.append(doc)
+            if len(unique_docs) < len(initial_docs):
+                logging.info(
+                    "Dropped %d duplicate docs before reranking",
+                    len(initial_docs) - len(unique_docs),
+                )
+            initial_docs = unique_docs
+
             reranked_docs = self.reranker.rerank(
                 query, initial_docs, top_k=rerank_k_final
             )
@@ -126,6 +151,24 @@ class RerankMMRRetriever:
         except Exception as e:
             raise MyException(e, sys)
 
+    def _candidate_vectors(self, candidates: Sequence[Document]) -> List[np.ndarray] | None:
+        """
+        Fetch stored embeddings for candidates directly from the FAISS index.
+        Returns None when any candidate cannot be resolved to an index row,
+        in which case the caller falls back to re-embedding.
+        """
+        index = getattr(self.vector_store, "index", None)
+        if index is None or not self._row_by_doc_id:
+            return None
+
+        vectors = []
+        for doc in candidates:
+            row = self._row_by_doc_id.get(getattr(doc, "id", None))
+            if row is None:
+                return None
+            vectors.append(np.array(index.reconstruct(row), dtype=np.float32))
+        return vectors
+
     def _apply_mmr(
         self, query: str, candidates: Sequence[Document], k: int, lambda_mult: float
     ) -> List[Document]:
@@ -133,39 +176,53 @@ class RerankMMRRetriever:
         if not candidates or k <= 0:
             return []
 
+        # With lambda ~1 MMR degenerates to pure relevance, and when every
+        # candidate will be kept anyway the selection order is moot; either
+        # way the reranked order already answers, so skip the embedding work.
+        if lambda_mult >= 0.999 or k >= len(candidates):
+            return list(candidates[:k])
+
         query_vec = np.array(self.embedder.embed_query(query), dtype=np.float32)
-        doc_vecs = [
-            np.array(vec, dtype=np.float32)
-            for vec in self.embedder.embed_documents(
-                [doc.page_content for doc in candidates]
-            )
-        ]
+        # Candidates were embedded at indexing time; reuse those vectors and
+        # only pay for the single small query embedding per request.
+        doc_vecs = self._candidate_vectors(candidates)
+        if doc_vecs is None:
+            doc_vecs = [
+                np.array(vec, dtype=np.float32)
+                for vec in self.embedder.embed_documents(
+                    [doc.page_content for doc in candidates]
+                )
+            ]
+
+        # Normalize once so every cosine similarity reduces to a dot product,
+        # then run the whole selection on BLAS matmuls instead of per-pair
+        # Python-level cosine calls.
+        doc_matrix = np.stack(doc_vecs)
+        doc_matrix /= np.linalg.norm(doc_matrix, axis=1, keepdims=True) + 1e-12
+        # Normalized unit vectors fit comfortably in fp16, halving memory
+        # bandwidth on the similarity products; the einsum reductions still
+        # accumulate in fp32 so scores stay stable.
+        doc_matrix = doc_matrix.astype(np.float16)
+        query_norm = (query_vec / (np.linalg.norm(query_vec) + 1e-12)).astype(np.float16)
+        relevance = np.einsum("ij,j->i", doc_matrix, query_norm, dtype=np.float32)
 
         selected: list[int] = []
-        remaining = list(range(len(candidates)))
+        # Running max similarity of each candidate to the selected set
+        max_sim_to_selected = np.full(len(candidates), -np.inf, dtype=relevance.dtype)
 
-        def cosine(a: np.ndarray, b: np.ndarray) -> float:
-            denom = (np.linalg.norm(a) * np.linalg.norm(b))
-            if denom == 0:
-                return 0.0
-            return float(np.dot(a, b) / denom)
-
-        while remaining and len(selected) < k:
+        while len(selected) < min(k, len(candidates)):
             if not selected:
                 # pick best relevance to query
-                chosen = max(remaining, key=lambda idx: cosine(query_vec, doc_vecs[idx]))
+                scores = relevance.copy()
             else:
-                chosen = max(
-                    remaining,
-                    key=lambda idx: lambda_mult * cosine(query_vec, doc_vecs[idx])
-                    - (1 - lambda_mult)
-                    * max(
-                        cosine(doc_vecs[idx], doc_vecs[sel_idx])
-                        for sel_idx in selected
-                    ),
-                )
+                scores = lambda_mult * relevance - (1 - lambda_mult) * max_sim_to_selected
+            scores[selected] = -np.inf
+            chosen = int(scores.argmax())
             selected.append(chosen)
-            remaining.remove(chosen)
+            max_sim_to_selected = np.maximum(
+                max_sim_to_selected,
+                np.einsum("ij,j->i", doc_matrix, doc_matrix[chosen], dtype=np.float32),
+            )
 
         return [candidates[idx] for idx in selected]
 
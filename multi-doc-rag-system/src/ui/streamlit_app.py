@@ -1,10 +1,13 @@
 import streamlit as st
+import functools
 import tempfile
+import threading
 import uuid
 import os
 import shutil
 import logging
 import time # Import time for placeholder simulation
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional, Dict, Any
 import html
 
@@ -254,6 +257,95 @@ st.markdown(
 
 # --- Core Logic Functions ---
 
+@st.cache_resource
+def get_pipeline(config_dir: str) -> RAGPipeline:
+    """Build the RAG pipeline once per config_dir and share it across reruns.
+
+    Pipeline construction loads configs, the LLM handle, and the
+    cross-encoder reranker; cache_resource keeps that cold start out of
+    every Streamlit rerun and shares the instance across sessions.
+    """
+    return RAGPipeline(config_dir=config_dir)
+
+
+# Cosine similarity a cached query must reach before its answer is reused
+QUERY_CACHE_THRESHOLD = 0.97
+
+
+@st.cache_resource
+def get_query_cache():
+    """Semantic query cache shared across reruns and sessions.
+
+    Holds normalized query embeddings in a small inner-product FAISS index
+    alongside their stored results, so a repeated or near-duplicate question
+    skips retrieval and generation entirely.
+    """
+    return {"lock": threading.Lock(), "index": None, "results": []}
+
+
+def _embed_query_normalized(pipeline, query: str):
+    """Embed and L2-normalize a query via the retriever's embedder.
+
+    Returns a (1, dim) float32 array, or None when no embedder is available
+    (e.g. before indexing or with the placeholder pipeline).
+    """
+    embedder = getattr(getattr(pipeline, "retriever", None), "embedder", None)
+    if embedder is None:
+        return None
+    try:
+        import numpy as np
+        vec = np.asarray(embedder.embed_query(query), dtype=np.float32)
+        norm = float(np.linalg.norm(vec))
+        if norm == 0.0:
+            return None
+        return (vec / norm).reshape(1, -1)
+    except Exception:
+        logging.exception("Query embedding for semantic cache failed")
+        return None
+
+
+def _lookup_cached_answer(query_vec):
+    """Return the cached result nearest to query_vec if close enough, else None."""
+    if query_vec is None:
+        return None
+    cache = get_query_cache()
+    with cache["lock"]:
+        index = cache["index"]
+        if index is None or not cache["results"]:
+            return None
+        scores, ids = index.search(query_vec, 1)
+    if ids[0][0] >= 0 and float(scores[0][0]) >= QUERY_CACHE_THRESHOLD:
+        return cache["results"][int(ids[0][0])]
+    return None
+
+
+def _store_cached_answer(query_vec, result) -> None:
+    """Add a freshly generated result to the semantic query cache."""
+    if query_vec is None:
+        return
+    try:
+        import faiss
+    except ImportError:
+        return
+    cache = get_query_cache()
+    with cache["lock"]:
+        if cache["index"] is None:
+            cache["index"] = faiss.IndexFlatIP(query_vec.shape[1])
+        cache["index"].add(query_vec)
+        cache["results"].append({
+            "answer": result.get("answer", ""),
+            "sources": result.get("sources", []),
+        })
+
+
+def _clear_query_cache() -> None:
+    """Drop all cached answers; call whenever the indexed corpus changes."""
+    cache = get_query_cache()
+    with cache["lock"]:
+        cache["index"] = None
+        cache["results"].clear()
+
+
 def cleanup_resources():
     """Clears the RAG pipeline instance and removes temporary files."""
     with st.spinner("Clearing resources..."):
@@ -265,9 +357,23 @@ def cleanup_resources():
                 del st.session_state.pipeline
             st.session_state.pipeline = None
 
+            _clear_query_cache()
+
             tmp = st.session_state.pop("tmp_dir", None)
             if tmp and os.path.exists(tmp):
-                shutil.rmtree(tmp, ignore_errors=True)
+                # Rename is O(1); the actual recursive delete of potentially
+                # hundreds of uploads happens off the UI thread.
+                trash = f"{tmp}.trash.{uuid.uuid4().hex}"
+                try:
+                    os.rename(tmp, trash)
+                    threading.Thread(
+                        target=shutil.rmtree,
+                        args=(trash,),
+                        kwargs={"ignore_errors": True},
+                        daemon=True,
+                    ).start()
+                except OSError:
+                    shutil.rmtree(tmp, ignore_errors=True)
             
             # Recreate tmp dir for next upload session
             st.session_state.tmp_dir = tempfile.mkdtemp(prefix="rag_uploads_")
@@ -283,11 +389,13 @@ def cleanup_resources():
             st.error(f"Cleanup failed: {e}")
 
 
+@functools.lru_cache(maxsize=1024)
 def display_name_from_path(p: str) -> str:
     """Return a human-friendly name for a path or URL, removing a UUID prefix if present.
 
     If the basename is prefixed with a 32-character UUID hex and an underscore,
     the function strips that prefix and returns the original filename.
+    Cached since the same paths are re-rendered on every rerun.
     """
     b = os.path.basename(p)
     parts = b.split("_", 1)
@@ -319,7 +427,7 @@ def sidebar():
             
             # Ensure we have a pipeline instance
             if st.session_state.pipeline is None:
-                st.session_state.pipeline = RAGPipeline(config_dir="configs")
+                st.session_state.pipeline = get_pipeline("configs")
 
             pipeline: RAGPipeline = st.session_state.pipeline
 
@@ -327,13 +435,23 @@ def sidebar():
                 # Save uploaded files to a temporary directory and build docs list
                 file_paths: List[str] = []
                 if uploaded_files:
-                    for f in uploaded_files:
+                    tmp_dir = st.session_state.tmp_dir
+
+                    def persist_upload(f) -> str:
                         # Preserve original filename but make it unique by prefixing a UUID
                         basename = os.path.basename(f.name)
-                        path = os.path.join(st.session_state.tmp_dir, f"{uuid.uuid4().hex}_{basename}")
+                        path = os.path.join(tmp_dir, f"{uuid.uuid4().hex}_{basename}")
                         with open(path, "wb") as out:
-                            out.write(f.read())
-                        file_paths.append(path)
+                            # Stream in 1 MiB pieces instead of materializing
+                            # the whole upload in memory first
+                            shutil.copyfileobj(f, out, length=1024 * 1024)
+                        return path
+
+                    # Overlap the disk writes across files; the UUID filenames
+                    # keep the workers independent. Parsing and embedding then
+                    # overlap inside prepare_vector_store's pipelined stages.
+                    with ThreadPoolExecutor(max_workers=min(8, len(uploaded_files))) as executor:
+                        file_paths = list(executor.map(persist_upload, uploaded_files))
 
                 docs: List[dict] = []
                 if file_paths:
@@ -348,6 +466,7 @@ def sidebar():
                 pipeline.prepare_vector_store()
 
                 st.sidebar.success("Documents indexed successfully!")
+                _clear_query_cache()  # answers from the old corpus are stale
                 st.session_state["status"] = "ready"
                 st.session_state["loaded_documents"] = [
                     {"name": d["name"], "path": d["path"]} for d in docs
@@ -422,30 +541,39 @@ def chat_area():
                 # 2. Display Sources
                 if sources:
                     with st.expander(f"📚 Sources Cited ({len(sources)} citation{'s' if len(sources) > 1 else ''})", expanded=False):
-                        for i, source in enumerate(sources):
-                            source_path = source.get('path', 'N/A')
-                            page_number = source.get('page_info')
-                            snippet = source.get('snippet', '') # This is the highlighted text from the original code
-                            source_name = display_name_from_path(source_path)
-
-                            # Format the source citation block
-                            st.markdown(
-                                f"""
-                                <div class="source-citation">
-                                    <p style="margin-bottom: 0.5rem; color: #f97316; font-weight: 700; font-size: 1.05rem;">
-                                        {i+1}. Source: {source_name}
-                                    </p>
-                                    <p style="margin-bottom: 0.5rem; color: #94a3b8; font-size: 0.9rem;">
-                                        📍 Location: <span style="color: #434547;">{page_number}</span>
-                                    </p>
-                                    <p style="margin-bottom: 0.25rem; color: #4b5563; font-size: 0.85rem; font-family: monospace;">
-                                        📄 Path: <code>{source_name}</code>
-                                    </p>
-                                    {f'<div class="chunk-block"><p style="font-style: italic; color: #4b5563;">Snippet:</p><div class="chunk-body">{snippet}</div></div>' if snippet else ''}
-                                </div>
-                                """,
-                                unsafe_allow_html=True
-                            )
+                        # Streamlit re-executes this loop for the whole history
+                        # on every rerun, so build the citation HTML for each
+                        # message once and stash it on the message dict; later
+                        # reruns just re-emit the prebuilt string.
+                        sources_html = response_content.get("_sources_html")
+                        if sources_html is None:
+                            html_parts = []
+                            for i, source in enumerate(sources):
+                                source_path = source.get('path', 'N/A')
+                                page_number = source.get('page_info')
+                                snippet = source.get('snippet', '') # This is the highlighted text from the original code
+                                source_name = html.escape(display_name_from_path(source_path))
+
+                                # Format the source citation block
+                                html_parts.append(
+                                    f"""
+                                    <div class="source-citation">
+                                        <p style="margin-bottom: 0.5rem; color: #f97316; font-weight: 700; font-size: 1.05rem;">
+                                            {i+1}. Source: {source_name}
+                                        </p>
+                                        <p style="margin-bottom: 0.5rem; color: #94a3b8; font-size: 0.9rem;">
+                                            📍 Location: <span style="color: #434547;">{page_number}</span>
+                                        </p>
+                                        <p style="margin-bottom: 0.25rem; color: #4b5563; font-size: 0.85rem; font-family: monospace;">
+                                            📄 Path: <code>{source_name}</code>
+                                        </p>
+                                        {f'<div class="chunk-block"><p style="font-style: italic; color: #4b5563;">Snippet:</p><div class="chunk-body">{snippet}</div></div>' if snippet else ''}
+                                    </div>
+                                    """
+                                )
+                            sources_html = "".join(html_parts)
+                            response_content["_sources_html"] = sources_html
+                        st.markdown(sources_html, unsafe_allow_html=True)
                 else:
                     st.markdown(
                         '<p style="color: #64748b; font-size: 0.9rem; font-style: italic; margin-top: 1rem;">No specific sources were cited for this response.</p>',
@@ -483,29 +611,52 @@ def chat_area():
     if st.session_state["pending_query"]:
         query_to_process = st.session_state["pending_query"]
         
-        # This spinner blocks the thread while the LLM processes, but the previous rerun
-        # ensures the user's message is already visible in the chat history.
-        with st.spinner(f"Retrieving information for: \"{query_to_process}\"…"):
-            try:
-                pipeline: RAGPipeline = st.session_state.get("pipeline")
-                
-                if not pipeline:
-                    error_result = {"answer": "Error: Pipeline is not initialized. Please index documents first.", "sources": []}
-                    st.session_state["messages"].append({"role": "assistant", "content": error_result})
-                else:
-                    # Run the RAG query
-                    result = pipeline.answer_with_sources(query_to_process)
-                    
-                    # Store the structured result
-                    st.session_state["messages"].append({"role": "assistant", "content": result})
-                
-            except MyException as me:
-                error_result = {"answer": f"Failed to fetch answer (MyException): {me}", "sources": []}
-                st.session_state["messages"].append({"role": "assistant", "content": error_result})
-            except Exception as e:
-                logging.exception("Query failed: %s", e)
-                error_result = {"answer": f"Failed to fetch answer: {e}", "sources": []}
+        try:
+            pipeline: RAGPipeline = st.session_state.get("pipeline")
+
+            cached_result = None
+            query_vec = None
+            if pipeline:
+                # Near-duplicate questions answer from the semantic cache
+                query_vec = _embed_query_normalized(pipeline, query_to_process)
+                cached_result = _lookup_cached_answer(query_vec)
+
+            if not pipeline:
+                error_result = {"answer": "Error: Pipeline is not initialized. Please index documents first.", "sources": []}
                 st.session_state["messages"].append({"role": "assistant", "content": error_result})
+            elif cached_result is not None:
+                st.session_state["messages"].append({"role": "assistant", "content": dict(cached_result)})
+            elif hasattr(pipeline, "answer_with_sources_stream"):
+                # Stream tokens into a live placeholder so the user sees the
+                # answer forming instead of waiting behind a spinner.
+                with st.chat_message("assistant", avatar="🤖"):
+                    placeholder = st.empty()
+                    placeholder.markdown(f"_Retrieving information for: \"{query_to_process}\"…_")
+                    buf: List[str] = []
+                    sources: List[Dict[str, str]] = []
+                    for delta, maybe_sources in pipeline.answer_with_sources_stream(query_to_process):
+                        if maybe_sources is not None:
+                            sources = maybe_sources
+                        elif delta:
+                            buf.append(delta)
+                            placeholder.markdown("".join(buf))
+                result = {"answer": "".join(buf), "sources": sources}
+                _store_cached_answer(query_vec, result)
+                st.session_state["messages"].append({"role": "assistant", "content": result})
+            else:
+                # Placeholder pipeline without streaming support
+                with st.spinner(f"Retrieving information for: \"{query_to_process}\"…"):
+                    result = pipeline.answer_with_sources(query_to_process)
+                _store_cached_answer(query_vec, result)
+                st.session_state["messages"].append({"role": "assistant", "content": result})
+
+        except MyException as me:
+            error_result = {"answer": f"Failed to fetch answer (MyException): {me}", "sources": []}
+            st.session_state["messages"].append({"role": "assistant", "content": error_result})
+        except Exception as e:
+            logging.exception("Query failed: %s", e)
+            error_result = {"answer": f"Failed to fetch answer: {e}", "sources": []}
+            st.session_state["messages"].append({"role": "assistant", "content": error_result})
 
         # Cleanup and final rerun to update the chat history with the response/error
         st.session_state["pending_query"] = None
@@ -1,3 +1,4 @@
+import functools
 import math
 import os
 import re
@@ -11,16 +12,38 @@ from langchain_core.documents import Document
 from src.exception import MyException
 from src.logger import logging
 
+# Prefer the libyaml-backed loader when PyYAML was built with it; it parses
+# an order of magnitude faster than the pure-Python SafeLoader.
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
+# Optional: Aho-Corasick automaton scans text for all keywords in one O(n)
+# pass, versus the backtracking alternation regex fallback.
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+
+# Resolved tiktoken encodings by model name: encoding_for_model rebuilds the
+# BPE ranks each call, which dwarfs the cost of the encode itself.
+_ENCODER_CACHE: dict = {}
+
 
 def num_tokens_from_string(text: str, model_name: str = "cl100k_base") -> int:
     """
     Returns the number of tokens in a text string.
     """
-    try:
-        encoding = tiktoken.encoding_for_model(model_name)
-    except KeyError:
-        # Fallback to a common encoding if model_name is not directly supported
-        encoding = tiktoken.get_encoding("cl100k_base")
+    encoding = _ENCODER_CACHE.get(model_name)
+    if encoding is None:
+        try:
+            encoding = tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            # Fallback to a common encoding if model_name is not directly supported
+            encoding = tiktoken.get_encoding("cl100k_base")
+        _ENCODER_CACHE[model_name] = encoding
     num_tokens = len(encoding.encode(text))
     return num_tokens
 
@@ -28,7 +51,7 @@ def num_tokens_from_string(text: str, model_name: str = "cl100k_base") -> int:
 def read_yaml_file(file_path: str) -> dict:
     try:
         with open(file_path, "rb") as yaml_file:
-            return yaml.safe_load(yaml_file)
+            return yaml.load(yaml_file, Loader=_YamlLoader)
 
     except Exception as e:
         raise MyException(e, sys) from e
@@ -38,9 +61,15 @@ def load_configs(config_dir: str) -> Dict:
     """Load all configuration files from the specified directory."""
     try:
         configs = {}
+        # One directory scan instead of a stat per expected file
+        try:
+            present = {entry.name for entry in os.scandir(config_dir)}
+        except FileNotFoundError:
+            present = set()
         for name in ["ingestion", "chunking", "retrieval", "generation", "pipeline"]:
-            path = os.path.join(config_dir, f"{name}.yaml")
-            if os.path.exists(path):
+            filename = f"{name}.yaml"
+            path = os.path.join(config_dir, filename)
+            if filename in present:
                 configs.update(read_yaml_file(path) or {})
             else:
                 logging.warning("Config file missing: %s", path)
@@ -70,6 +99,15 @@ def count_documents(vector_store) -> int:
     """
     Safely count documents in a FAISS store.
     """
+    # The FAISS index tracks its own count; ntotal is a plain attribute read
+    # and avoids touching the Python-side id mapping at all.
+    index = getattr(vector_store, "index", None)
+    if index is not None:
+        try:
+            return int(index.ntotal)
+        except Exception:
+            pass
+
     ids = getattr(vector_store, "index_to_docstore_id", None)
     if ids is not None:
         try:
@@ -90,6 +128,13 @@ def count_documents(vector_store) -> int:
 # RAG Pipeline Helper Functions
 # ----------------------------
 
+# Matches one sentence (text up to .!? plus trailing whitespace) so a chunk
+# can be walked in a single regex sweep.
+_SENTENCE_RE = re.compile(r'[^.!?]+[.!?]?\s*')
+
+# Word tokenizer for highlight keywords, compiled once at import
+_WORD_RE = re.compile(r"\b\w+\b")
+
 def build_context(docs: Sequence[Document], include_citations: bool = False) -> str:
     """Concatenate documents into a single context string."""
     # Note: include_citations parameter kept for API compatibility but not implemented
@@ -98,40 +143,74 @@ def build_context(docs: Sequence[Document], include_citations: bool = False) ->
     return "\n\n".join(parts)
 
 
-def _build_highlight_pattern(answer_text: str) -> re.Pattern | None:
+@functools.lru_cache(maxsize=32)
+def _build_highlight_matcher(answer_text: str):
     """
-    Build a regex pattern for highlightable keywords from the answer text.
-    Keeps unique words longer than 3 characters.
+    Build a callable testing whether a sentence mentions any highlightable
+    keyword from the answer text. Keeps unique words longer than 3
+    characters. Cached so the tokenization and matcher construction run
+    once per distinct answer, not per chunk.
+
+    With pyahocorasick installed the matcher is a single-pass automaton
+    scan regardless of keyword count; otherwise it falls back to a compiled
+    alternation regex.
     """
     if not answer_text:
         return None
-    words = re.findall(r"\b\w+\b", answer_text.lower())
-    keywords = [w for w in words if len(w) > 3]
-    deduped = list(dict.fromkeys(keywords))
+    # Matching is case-insensitive either way, so only the dedupe key needs
+    # normalizing; casefolding per kept token avoids copying the whole
+    # answer lowercased first.
+    words = _WORD_RE.findall(answer_text)
+    deduped = list(dict.fromkeys(w.casefold() for w in words if len(w) > 3))[:50]
     if not deduped:
         return None
-    escaped = [re.escape(w) for w in deduped[:50]]
-    return re.compile(r"\b(" + "|".join(escaped) + r")\b", flags=re.IGNORECASE)
 
+    if ahocorasick is not None:
+        automaton = ahocorasick.Automaton()
+        for word in deduped:
+            automaton.add_word(word, word)
+        automaton.make_automaton()
+
+        def matches(sentence: str) -> bool:
+            lowered = sentence.casefold()
+            for end, word in automaton.iter(lowered):
+                # The automaton matches substrings; keep the regex \b
+                # semantics by requiring non-word characters around the hit.
+                start = end - len(word) + 1
+                before = lowered[start - 1] if start > 0 else " "
+                after = lowered[end + 1] if end + 1 < len(lowered) else " "
+                if (
+                    not (before.isalnum() or before == "_")
+                    and not (after.isalnum() or after == "_")
+                ):
+                    return True
+            return False
+
+        return matches
 
-def highlight_overlap(text: str, answer_text: str) -> str:
+    escaped = [re.escape(w) for w in deduped]
+    return re.compile(r"\b(" + "|".join(escaped) + r")\b", flags=re.IGNORECASE).search
+
+
+def highlight_overlap(text: str, matcher) -> str:
     """
     Highlight sentences (not individual words) from the source chunk that overlap
-    with words in the answer. Returns HTML with <mark> wrapped sentences.
+    with words in the answer. Takes the prebuilt keyword matcher so callers
+    looping over chunks build it once. Returns HTML with <mark> wrapped sentences.
     """
-    pattern = _build_highlight_pattern(answer_text)
-    if not pattern:
+    if not matcher:
         return text
 
-    # Split into sentences while retaining punctuation.
-    sentences = re.split(r'(?<=[.!?])\s+', text)
+    # Single finditer sweep over sentence spans instead of a split pass plus
+    # a search per fragment; slices preserve the original whitespace exactly.
     highlighted = []
-    for sent in sentences:
-        if pattern.search(sent):
+    for match in _SENTENCE_RE.finditer(text):
+        sent = match.group()
+        if matcher(sent):
             highlighted.append(f"<mark>{sent}</mark>")
         else:
             highlighted.append(sent)
-    return " ".join(highlighted)
+    return "".join(highlighted)
 
 
 def extract_sources(docs: Sequence[Document], answer_text: str | None = None) -> List[Dict[str, str]]:
@@ -141,7 +220,12 @@ def extract_sources(docs: Sequence[Document], answer_text: str | None = None) ->
     """
     sources = []
     seen_sources = set()
-    
+    # One matcher per answer, shared by every chunk below
+    matcher = _build_highlight_matcher(answer_text) if answer_text else None
+    # Identical chunk text (same content on different pages/files) gets the
+    # same markup, so highlight each distinct text once
+    highlighted_by_text: Dict[str, str] = {}
+
     for doc in docs:
         meta = doc.metadata or {}
         source_path = meta.get("source", "unknown")
@@ -163,7 +247,13 @@ def extract_sources(docs: Sequence[Document], answer_text: str | None = None) ->
             page_info = f"Page {page}" if page != "N/A" else "N/A"
             
             chunk_text = doc.page_content
-            highlighted_chunk = highlight_overlap(chunk_text, answer_text) if answer_text else chunk_text
+            if matcher:
+                highlighted_chunk = highlighted_by_text.get(chunk_text)
+                if highlighted_chunk is None:
+                    highlighted_chunk = highlight_overlap(chunk_text, matcher)
+                    highlighted_by_text[chunk_text] = highlighted_chunk
+            else:
+                highlighted_chunk = chunk_text
             
             sources.append({
                 "path": normalized_path,